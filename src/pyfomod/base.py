@@ -54,20 +54,19 @@ class HashableSequence(object):
             yield self[i]
 
     def index(self, value, start=0, stop=None):
+        length = len(self)
         if start is not None and start < 0:
-            start = max(len(self) + start, 0)
-        if stop is not None and stop < 0:
-            stop += len(self)
-
-        i = start
-        while stop is None or i < stop:
-            try:
-                v = self[i]
-                if v is value or v == value:
-                    return i
-            except IndexError:
-                break
-            i += 1
+            start = max(length + start, 0)
+        if stop is None or stop > length:
+            stop = length
+        elif stop < 0:
+            stop += length
+
+        # bounded by the length so no IndexError has to be caught
+        for i in range(start, stop):
+            v = self[i]
+            if v is value or v == value:
+                return i
         raise ValueError
 
     def count(self, value):
@@ -41,12 +41,15 @@ from .warnings import (
     VersionDependencyWarning,
 )
 
+# (class, callback key) -> whether the callbacks under that key apply to the class
+_CALLBACK_MATCHES = {}
+
 
 class FomodEnum(Enum):
     @classmethod
     def default(cls):
         # default becomes the first defined member
-        return list(cls.__members__.values())[0]
+        return next(iter(cls))
 
 
 class ConditionType(FomodEnum):
@@ -82,6 +85,18 @@ class OptionType(FomodEnum):
     COULDBEUSABLE = "CouldBeUsable"
 
 
+# group type -> warning for groups where no option can be selected
+_NO_USABLE_WARNINGS = {
+    GroupType.ATLEASTONE: AtLeastOneWarning,
+    GroupType.EXACTLYONE: ExactlyOneMissingWarning,
+}
+# group type -> warning for groups with two or more required options
+_MANY_REQUIRED_WARNINGS = {
+    GroupType.ATMOSTONE: AtMostOneWarning,
+    GroupType.EXACTLYONE: ExactlyOneRequiredWarning,
+}
+
+
 class BaseFomod(object):
     def __init__(self, tag, attrib):
         self._tag = tag
@@ -99,32 +114,34 @@ class BaseFomod(object):
     def validate(self, **callbacks):
         warnings = []
         for key, funcs in callbacks.items():
-            if isinstance(self, globals()[key]):
+            cache_key = (type(self), key)
+            try:
+                matches = _CALLBACK_MATCHES[cache_key]
+            except KeyError:
+                matches = isinstance(self, globals()[key])
+                _CALLBACK_MATCHES[cache_key] = matches
+            if matches:
                 for func in funcs:
                     warnings.extend(func(self))
         return warnings
 
     @staticmethod
     def _write_attributes(attrib):
-        result = ""
-        for attr, value in attrib.items():
-            result += " "
-            result += str(attr)
-            result += "="
-            result += '"{}"'.format(str(value))
-        return result
+        if not attrib:  # most tags are written without extra attributes
+            return ""
+        return "".join(' {}="{}"'.format(attr, value) for attr, value in attrib.items())
 
     def _write_children(self):
-        children = ""
+        children = []
         for tag, data in self._children.items():
             attribs = data[0]
             text = data[1]
             attribs_str = self._write_attributes(attribs)
             if text:
-                children += "\n" + "<{0}{2}>{1}</{0}>".format(tag, text, attribs_str)
+                children.append("\n<{0}{2}>{1}</{0}>".format(tag, text, attribs_str))
             else:
-                children += "\n" + "<{}{}/>".format(tag, attribs_str)
-        return children
+                children.append("\n<{}{}/>".format(tag, attribs_str))
+        return "".join(children)
 
 
 class Root(BaseFomod):
@@ -275,16 +292,24 @@ class Root(BaseFomod):
 
     def validate(self, **callbacks):
         warnings = super().validate(**callbacks)
-        flag_set = []
+        flag_set = set()
         flag_dep = []
 
         def parse_conditions(conditions):
+            # explicit stack of (conditions, items iterator) - nested conditions
+            # are walked depth-first without recursing
             result = []
-            for key, value in conditions.items():
-                if isinstance(key, Conditions):
-                    result.extend(parse_conditions(key))
-                elif isinstance(key, str) and isinstance(value, str):
-                    result.append((key, conditions))
+            stack = [(conditions, iter(conditions.items()))]
+            while stack:
+                current, items = stack[-1]
+                for key, value in items:
+                    if isinstance(key, Conditions):
+                        stack.append((key, iter(key.items())))
+                        break
+                    elif isinstance(key, str) and isinstance(value, str):
+                        result.append((key, current))
+                else:
+                    stack.pop()
             return result
 
         # the lambdas need the 'or []' to comply with returning a list
@@ -292,7 +317,7 @@ class Root(BaseFomod):
             lambda x: flag_dep.extend(parse_conditions(x)) or []
         )
         callbacks.setdefault("Flags", []).append(
-            lambda x: flag_set.extend(x.keys()) or []
+            lambda x: flag_set.update(x.keys()) or []
         )
         warnings.extend(self._info.validate(**callbacks))
         warnings.extend(self._name.validate(**callbacks))
@@ -323,14 +348,22 @@ class Info(BaseFomod):
         super().__init__("fomod", attrib)
 
     def get_text(self, tag):
+        # tags are usually stored with the requested case, skip the scan then
+        if tag in self._children:
+            return self._children[tag][1]
+        tag = tag.lower()
         for key, value in self._children.items():
-            if key.lower() == tag.lower():
+            if key.lower() == tag:
                 return value[1]
         return ""
 
     def set_text(self, tag, text):
+        if tag in self._children:
+            self._children[tag] = (self._children[tag][0], text)
+            return
+        lower_tag = tag.lower()
         for key, value in self._children.items():
-            if key.lower() == tag.lower():
+            if key.lower() == lower_tag:
                 self._children[key] = (value[0], text)
                 return
         self._children[tag] = ({}, text)
@@ -394,16 +427,18 @@ class Conditions(BaseFomod, HashableMapping):
         return self._map[key]
 
     def __setitem__(self, key, value):
-        if key is not None and not isinstance(key, (str, Conditions)):
-            raise TypeError("Key must be either None, string or Conditions.")
-        if key is None and not isinstance(value, str):
-            raise TypeError("Value for None key must be string.")
-        if isinstance(key, str) and not isinstance(value, (str, FileType)):
-            raise TypeError("Value for string key must be string or FileType.")
-        if isinstance(key, Conditions):
+        if key is None:
+            if not isinstance(value, str):
+                raise TypeError("Value for None key must be string.")
+        elif isinstance(key, str):
+            if not isinstance(value, (str, FileType)):
+                raise TypeError("Value for string key must be string or FileType.")
+        elif isinstance(key, Conditions):
             if value is not None:
                 raise TypeError("Value for Conditions key must be None.")
             key._tag = "dependencies"
+        else:
+            raise TypeError("Key must be either None, string or Conditions.")
         self._map[key] = value
 
     def __delitem__(self, key):
@@ -416,7 +451,7 @@ class Conditions(BaseFomod, HashableMapping):
         return len(self._map)
 
     def to_string(self):
-        children = ""
+        children = []
         attrib = dict(self._attrib)
         attrib["operator"] = self._type.value
         head = "<{}{}>".format(self._tag, self._write_attributes(attrib))
@@ -426,13 +461,15 @@ class Conditions(BaseFomod, HashableMapping):
             elif isinstance(key, Conditions) and bool(key):
                 child = key.to_string()
             elif isinstance(value, str):  # string key
-                tag = "flagDependency"
-                child = '<{} flag="{}" value="{}"/>'.format(tag, key, value)
+                child = '<flagDependency flag="{}" value="{}"/>'.format(key, value)
             elif isinstance(value, FileType) and bool(key):  # string key
-                tag = "fileDependency"
-                child = '<{} file="{}" state="{}"/>'.format(tag, key, value.value)
-            children += "\n" + child
-        children = children.replace("\n", "\n  ")
+                child = '<fileDependency file="{}" state="{}"/>'.format(
+                    key, value.value
+                )
+            else:  # nothing to write
+                continue
+            children.append("\n" + child)
+        children = "".join(children).replace("\n", "\n  ")
         tail = "</{}>".format(self._tag)
         return "{}{}\n{}".format(head, children, tail)
 
@@ -460,15 +497,25 @@ class Files(BaseFomod, HashableMapping):
         super().__init__("files", attrib)
         self._file_list = []
 
+    def _find_index(self, key):
+        # an exact source match wins, otherwise a key with a trailing slash
+        # can refer to a folder whose source is stored without it
+        stripped = key[:-1] if key.endswith(("/", "\\")) else None
+        fallback = None
+        for index, item in enumerate(self._file_list):
+            if item.src == key:
+                return index
+            if fallback is None and item.src == stripped:
+                fallback = index
+        return fallback
+
     def __getitem__(self, key):
         if not isinstance(key, str):
             raise TypeError("Key must be string.")
-        if key.endswith(("/", "\\")) and key not in self:
-            key = key[:-1]
-        try:
-            return next(a.dst for a in self._file_list if a.src == key)
-        except StopIteration:
+        index = self._find_index(key)
+        if index is None:
             raise KeyError()
+        return self._file_list[index].dst
 
     # trailing slash -> folder, else file
     def __setitem__(self, key, value):
@@ -476,31 +523,27 @@ class Files(BaseFomod, HashableMapping):
             raise TypeError("Key must be string.")
         if not isinstance(value, str):
             raise TypeError("Value must be string.")
-        folder = False
-        if key.endswith(("/", "\\")) and key not in self:
+        index = self._find_index(key)
+        if index is not None:
+            self._file_list[index].dst = value
+            return
+        if key.endswith(("/", "\\")):
+            new = File(tag="folder")
             key = key[:-1]
-            folder = True
-        try:
-            next(a for a in self._file_list if a.src == key).dst = value
-        except StopIteration:
-            if folder:
-                new = File(tag="folder")
-            else:
-                new = File(tag="file")
-            new.src = key
-            new.dst = value
-            self._file_list.append(new)
+        else:
+            new = File(tag="file")
+        new.src = key
+        new.dst = value
+        self._file_list.append(new)
 
     def __delitem__(self, key):
         if not isinstance(key, str):
             raise TypeError("Key must be string.")
-        if key.endswith(("/", "\\")) and key not in self:
-            key = key[:-1]
-        try:
-            value = next(a for a in self._file_list if a.src == key)
-            self._file_list.remove(value)
-        except StopIteration:
+        index = self._find_index(key)
+        if index is None:
             raise KeyError()
+        # deleting by index avoids a second scan of the list
+        del self._file_list[index]
 
     def __iter__(self):
         for item in self._file_list:
@@ -520,10 +563,8 @@ class Files(BaseFomod, HashableMapping):
             return False
 
     def to_string(self):
-        children = ""
         head = "<{}{}>".format(self._tag, self._write_attributes(self._attrib))
-        for child in self._file_list:
-            children += "\n" + child.to_string()
+        children = "".join("\n" + child.to_string() for child in self._file_list)
         children = children.replace("\n", "\n  ")
         tail = "</{}>".format(self._tag)
         return "{}{}\n{}".format(head, children, tail)
@@ -593,19 +634,21 @@ class Pages(BaseFomod, HashableSequence):
     def __len__(self):
         return len(self._page_list)
 
+    def __iter__(self):
+        return iter(self._page_list)
+
     def insert(self, key, value):
         if not isinstance(value, Page):
             raise ValueError("Value should be Page.")
         self._page_list.insert(key, value)
 
     def to_string(self):
-        children = ""
         attrib = dict(self._attrib)
         attrib["order"] = self._order.value
         head = "<{}{}>".format(self._tag, self._write_attributes(attrib))
-        for child in self._page_list:
-            if child:
-                children += "\n" + child.to_string()
+        children = "".join(
+            "\n" + child.to_string() for child in self._page_list if child
+        )
         children = children.replace("\n", "\n  ")
         tail = "</{}>".format(self._tag)
         return "{}{}\n{}".format(head, children, tail)
@@ -675,29 +718,30 @@ class Page(BaseFomod, HashableSequence):
     def __len__(self):
         return len(self._group_list)
 
+    def __iter__(self):
+        return iter(self._group_list)
+
     def insert(self, key, value):
         if not isinstance(value, Group):
             raise ValueError("Value should be Group.")
         self._group_list.insert(key, value)
 
     def to_string(self):
-        children = ""
-        grp_tag = "optionalFileGroups"
+        children = []
         attrib = dict(self._attrib)
         attrib["name"] = self._name
-        grp_attrib = {"order": self._order.value}
         head = "<{}{}>".format(self._tag, self._write_attributes(attrib))
-        grp_head = "<{}{}>".format(grp_tag, self._write_attributes(grp_attrib))
-        grp_tail = "</{}>".format(grp_tag)
+        grp_head = '<optionalFileGroups order="{}">'.format(self._order.value)
+        grp_tail = "</optionalFileGroups>"
         tail = "</{}>".format(self._tag)
         if self._conditions:
-            children += "\n" + self._conditions.to_string()
-        children += "\n" + grp_head
+            children.append("\n" + self._conditions.to_string())
+        children.append("\n" + grp_head)
         for child in self._group_list:
             if child:
-                children += "\n  " + child.to_string().replace("\n", "\n  ")
-        children += "\n" + grp_tail
-        children = children.replace("\n", "\n  ")
+                children.append("\n  " + child.to_string().replace("\n", "\n  "))
+        children.append("\n" + grp_tail)
+        children = "".join(children).replace("\n", "\n  ")
         return "{}{}\n{}".format(head, children, tail)
 
     def validate(self, **callbacks):
@@ -769,27 +813,28 @@ class Group(BaseFomod, HashableSequence):
     def __len__(self):
         return len(self._option_list)
 
+    def __iter__(self):
+        return iter(self._option_list)
+
     def insert(self, key, value):
         if not isinstance(value, Option):
             raise ValueError("Value should be Option.")
         self._option_list.insert(key, value)
 
     def to_string(self):
-        children = ""
-        opt_tag = "plugins"
+        children = []
         attrib = dict(self._attrib)
         attrib["name"] = self._name
         attrib["type"] = self._type.value
-        opt_attrib = {"order": self._order.value}
         head = "<{}{}>".format(self._tag, self._write_attributes(attrib))
-        opt_head = "<{}{}>".format(opt_tag, self._write_attributes(opt_attrib))
-        opt_tail = "</{}>".format(opt_tag)
+        opt_head = '<plugins order="{}">'.format(self._order.value)
+        opt_tail = "</plugins>"
         tail = "</{}>".format(self._tag)
-        children += "\n" + opt_head
+        children.append("\n" + opt_head)
         for child in self._option_list:
-            children += "\n  " + child.to_string().replace("\n", "\n  ")
-        children += "\n" + opt_tail
-        children = children.replace("\n", "\n  ")
+            children.append("\n  " + child.to_string().replace("\n", "\n  "))
+        children.append("\n" + opt_tail)
+        children = "".join(children).replace("\n", "\n  ")
         return "{}{}\n{}".format(head, children, tail)
 
     def validate(self, **callbacks):
@@ -807,27 +852,28 @@ class Group(BaseFomod, HashableSequence):
 
         for option in self._option_list:
             warnings.extend(option.validate(**callbacks))
-            if isinstance(option.type, OptionType):
-                if option.type is OptionType.REQUIRED:
+            option_type = option.type
+            if isinstance(option_type, OptionType):
+                if option_type is OptionType.REQUIRED:
                     required_options += 1
-                elif option.type is OptionType.NOTUSABLE:
+                elif option_type is OptionType.NOTUSABLE:
                     notusable_options += 1
             else:
-                if OptionType.REQUIRED in option.type.values():
+                # a single pass over the conditional types
+                option_types = set(option_type.values())
+                if OptionType.REQUIRED in option_types:
                     required_options += 1
-                elif OptionType.NOTUSABLE in option.type.values():
+                elif OptionType.NOTUSABLE in option_types:
                     notusable_options += 1
 
         if notusable_options == option_num:
-            if self.type is GroupType.ATLEASTONE:
-                warnings.append(AtLeastOneWarning(self))
-            elif self.type is GroupType.EXACTLYONE:
-                warnings.append(ExactlyOneMissingWarning(self))
+            warning = _NO_USABLE_WARNINGS.get(self._type)
         elif required_options >= 2:
-            if self.type is GroupType.ATMOSTONE:
-                warnings.append(AtMostOneWarning(self))
-            elif self.type is GroupType.EXACTLYONE:
-                warnings.append(ExactlyOneRequiredWarning(self))
+            warning = _MANY_REQUIRED_WARNINGS.get(self._type)
+        else:
+            warning = None
+        if warning is not None:
+            warnings.append(warning(self))
         return warnings
 
 
@@ -918,12 +964,12 @@ class Option(BaseFomod):
             children += "\n" + self.files.to_string()
         if self.flags:
             children += "\n" + self.flags.to_string()
-        children += "\n" + "<typeDescriptor>"
+        children += "\n<typeDescriptor>"
         if isinstance(self.type, OptionType):
-            children += "\n  " + '<type name="{}"/>'.format(self.type.value)
+            children += '\n  <type name="{}"/>'.format(self.type.value)
         else:
             children += "\n  " + self.type.to_string()
-        children += "\n" + "</typeDescriptor>"
+        children += "\n</typeDescriptor>"
         children = children.replace("\n", "\n  ")
         tail = "</{}>".format(self._tag)
         return "{}{}\n{}".format(head, children, tail)
@@ -972,10 +1018,11 @@ class Flags(BaseFomod, HashableMapping):
         return len(self._map)
 
     def to_string(self):
-        children = ""
         head = "<{}{}>".format(self._tag, self._write_attributes(self._attrib))
-        for key, value in self._map.items():
-            children += "\n" + '<flag name="{}">{}</flag>'.format(key, value)
+        children = "".join(
+            '\n<flag name="{}">{}</flag>'.format(key, value)
+            for key, value in self._map.items()
+        )
         children = children.replace("\n", "\n  ")
         tail = "</{}>".format(self._tag)
         return "{}{}\n{}".format(head, children, tail)
@@ -1020,18 +1067,21 @@ class Type(BaseFomod, HashableMapping):
         return len(self._map)
 
     def to_string(self):
-        children = ""
+        children = []
         head = "<{}{}>".format(self._tag, self._write_attributes(self._attrib))
-        children += "\n"
-        children += '<defaultType name="{}"/>'.format(self.default.value)
-        children += "\n" + "<patterns>"
+        children.append('\n<defaultType name="{}"/>'.format(self.default.value))
+        children.append("\n<patterns>")
         for key, value in self._map.items():
-            children += "\n  " + "<pattern>"
-            children += "\n    " + key.to_string().replace("\n", "\n    ")
-            children += "\n    " + '<type name="{}"/>'.format(value.value)
-            children += "\n  " + "</pattern>"
-        children += "\n" + "</patterns>"
-        children = children.replace("\n", "\n  ")
+            children.extend(
+                (
+                    "\n  <pattern>",
+                    "\n    " + key.to_string().replace("\n", "\n    "),
+                    '\n    <type name="{}"/>'.format(value.value),
+                    "\n  </pattern>",
+                )
+            )
+        children.append("\n</patterns>")
+        children = "".join(children).replace("\n", "\n  ")
         tail = "</{}>".format(self._tag)
         return "{}{}\n{}".format(head, children, tail)
 
@@ -1073,16 +1123,20 @@ class FilePatterns(BaseFomod, HashableMapping):
         return len(self._map)
 
     def to_string(self):
-        children = ""
+        children = []
         head = "<{}{}>".format(self._tag, self._write_attributes(self._attrib))
-        children += "\n" + "<patterns>"
+        children.append("\n<patterns>")
         for key, value in self._map.items():
-            children += "\n  " + "<pattern>"
-            children += "\n    " + key.to_string().replace("\n", "\n    ")
-            children += "\n    " + value.to_string().replace("\n", "\n    ")
-            children += "\n  " + "</pattern>"
-        children += "\n" + "</patterns>"
-        children = children.replace("\n", "\n  ")
+            children.extend(
+                (
+                    "\n  <pattern>",
+                    "\n    " + key.to_string().replace("\n", "\n    "),
+                    "\n    " + value.to_string().replace("\n", "\n    "),
+                    "\n  </pattern>",
+                )
+            )
+        children.append("\n</patterns>")
+        children = "".join(children).replace("\n", "\n  ")
         tail = "</{}>".format(self._tag)
         return "{}{}\n{}".format(head, children, tail)
 
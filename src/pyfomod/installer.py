@@ -17,11 +17,20 @@ from collections import OrderedDict
 from collections.abc import Sequence
 from contextlib import suppress
 from distutils.version import LooseVersion
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
 from pathlib import Path
 
 from . import fomod, parser
 
 
+@lru_cache(maxsize=None)
+def _loose_version(version):
+    # the same few version strings are compared on every version condition
+    return LooseVersion(version)
+
+
 class _FailedCondition(Exception):
     pass
 
@@ -89,6 +98,9 @@ class InstallerPage(Sequence):
 
 
 class FileInfo(object):
+    # one is created per installed file, possibly thousands per install
+    __slots__ = ("source", "destination", "priority")
+
     def __init__(self, source, destination, priority):
         self.source = source
         self.destination = destination
@@ -112,30 +124,27 @@ class FileInfo(object):
                 # if empty or with a trailing slash then dest refers
                 # to a folder. Post-processing to add the filename to the
                 # end of the path.
-                destination = str(Path(destination) / Path(source).name)
+                destination = str(Path(destination, os.path.basename(source)))
             else:
                 # destination still needs normalizing
                 destination = str(Path(destination))
             priority = int(file_object._attrib.get("priority", "0"))
-            if (
-                path is None
-                or not (path / source).exists()
-                or (path / source).is_file()
-            ):
+            source_path = None if path is None else path / source
+            # a single stat call - anything other than an existing folder
+            # (missing paths included) is passed along as is
+            if source_path is None or not source_path.is_dir():
                 result.append(cls(source, destination, priority))
                 continue
-            source_path = path / source
             for dirpath, dirnames, fnames in os.walk(source_path):
+                # the folder's paths are built once and reused for its files
+                src_dir = Path(dirpath).relative_to(path)
+                dst_dir = Path(destination, Path(dirpath).relative_to(source_path))
                 if not dirnames and not fnames:
-                    src = str(Path(dirpath).relative_to(path))
-                    dst = str(Path(destination, Path(dirpath).relative_to(source_path)))
-                    result.append(cls(src, dst, priority))
+                    result.append(cls(str(src_dir), str(dst_dir), priority))
                     continue
                 for fname in fnames:
-                    src = str(Path(dirpath, fname).relative_to(path))
-                    dst = str(
-                        Path(destination, Path(dirpath, fname).relative_to(source_path))
-                    )
+                    src = str(src_dir / fname)
+                    dst = str(dst_dir / fname)
                     result.append(cls(src, dst, priority))
         return result
 
@@ -173,54 +182,64 @@ class Installer(object):
             selected_options = []
         # get the real options
         real_options = [option._object for option in selected_options]
+        selected_set = set(real_options)
         # validate options
         for group in self._current_page:
-            # validate group type
-            selected_num = sum(1 for option in real_options if option in group)
-            if group.type is fomod.GroupType.ALL and selected_num != len(group):
-                raise InvalidSelection(
-                    f"Group {group.name} requires all "
-                    f"options to be selected but only "
-                    f"{selected_num} were selected."
-                )
-            elif group.type is fomod.GroupType.EXACTLYONE and selected_num != 1:
-                raise InvalidSelection(
-                    f"Group {group.name} requires exactly "
-                    f"one option to be selected but "
-                    f"{selected_num} were selected."
-                )
-            elif group.type is fomod.GroupType.ATLEASTONE and selected_num < 1:
-                raise InvalidSelection(
-                    f"Group {group.name} requires at "
-                    f"least one option to be selected "
-                    f"but {selected_num} were selected."
-                )
-            elif group.type is fomod.GroupType.ATMOSTONE and selected_num > 1:
-                raise InvalidSelection(
-                    f"Group {group.name} requires at "
-                    f"most one option to be selected "
-                    f"but {selected_num} were selected."
-                )
+            # validate group type - any selection is valid for SelectAny
+            # so the selected options are only counted for other types
+            group_type = group.type
+            if group_type is not fomod.GroupType.ANY:
+                group_set = set(group)
+                selected_num = sum(1 for option in real_options if option in group_set)
+                if group_type is fomod.GroupType.ALL and selected_num != len(group):
+                    raise InvalidSelection(
+                        f"Group {group.name} requires all "
+                        f"options to be selected but only "
+                        f"{selected_num} were selected."
+                    )
+                elif group_type is fomod.GroupType.EXACTLYONE and selected_num != 1:
+                    raise InvalidSelection(
+                        f"Group {group.name} requires exactly "
+                        f"one option to be selected but "
+                        f"{selected_num} were selected."
+                    )
+                elif group_type is fomod.GroupType.ATLEASTONE and selected_num < 1:
+                    raise InvalidSelection(
+                        f"Group {group.name} requires at "
+                        f"least one option to be selected "
+                        f"but {selected_num} were selected."
+                    )
+                elif group_type is fomod.GroupType.ATMOSTONE and selected_num > 1:
+                    raise InvalidSelection(
+                        f"Group {group.name} requires at "
+                        f"most one option to be selected "
+                        f"but {selected_num} were selected."
+                    )
             # validate option type
             for option in group:
-                inst_option = InstallerOption(self, option)  # resolves option type
+                option_type = option.type
+                # only conditional types need resolving against the flags
+                if isinstance(option_type, fomod.Type):
+                    option_type = InstallerOption(self, option).type
                 if (
-                    inst_option.type is fomod.OptionType.REQUIRED
-                    and option not in real_options
+                    option_type is fomod.OptionType.REQUIRED
+                    and option not in selected_set
                 ):
                     raise InvalidSelection(
                         f"Option {option.name} is required but was not selected."
                     )
                 elif (
-                    inst_option.type is fomod.OptionType.NOTUSABLE
-                    and option in real_options
+                    option_type is fomod.OptionType.NOTUSABLE and option in selected_set
                 ):
                     raise InvalidSelection(
                         f"Option {option.name} is not usable but was selected."
                     )
         # sort options
-        sorted_list = [option for group in self._current_page for option in group]
-        real_options = sorted(real_options, key=sorted_list.index)
+        option_order = {}
+        for group in self._current_page:
+            for option in group:
+                option_order.setdefault(option, len(option_order))
+        real_options = sorted(real_options, key=option_order.__getitem__)
         self._previous_pages[self._current_page] = real_options
         # order pages
         ordered_pages = self._order_list(self.root.pages, self.root.pages.order)
@@ -266,7 +285,7 @@ class Installer(object):
                 conditional_files.extend(FileInfo.process_files(files, self.path))
         file_dict = {}  # src -> dst
         priority_dict = {}  # dst -> priority
-        for info in required_files + user_files + conditional_files:
+        for info in chain(required_files, user_files, conditional_files):
             if info.destination in priority_dict:
                 if priority_dict[info.destination] > info.priority:
                     continue
@@ -276,15 +295,12 @@ class Installer(object):
         return {b: a for a, b in file_dict.items()}
 
     def flags(self):
+        # not cached - the selected options belong to the user and their
+        # flags may change between calls
         flag_dict = {}
-        flags_list = [
-            option.flags
-            for options in self._previous_pages.values()
-            for option in options
-        ]
-        for flags in flags_list:
-            for flag, value in flags.items():
-                flag_dict[flag] = value
+        for options in self._previous_pages.values():
+            for option in options:
+                flag_dict.update(option.flags)
         return flag_dict
 
     def _test_file_condition(self, file_name, file_type):
@@ -308,8 +324,8 @@ class Installer(object):
     def _test_version_condition(self, version):
         if self.game_version is None:
             return
-        game_version = LooseVersion(self.game_version)
-        version = LooseVersion(version)
+        game_version = _loose_version(self.game_version)
+        version = _loose_version(version)
         if game_version < version:
             raise _FailedCondition(
                 f"Game version is {game_version} but {version} is required."
@@ -317,9 +333,7 @@ class Installer(object):
 
     @staticmethod
     def _raise_failed_conditions(failed):
-        msg = "The following condition(s) have failed:"
-        for cond in failed:
-            msg += "\n\t" + cond
+        msg = "\n\t".join(["The following condition(s) have failed:"] + failed)
         raise FailedCondition(msg)
 
     def _test_conditions(self, conditions):
@@ -332,16 +346,16 @@ class Installer(object):
                 elif isinstance(key, str):
                     if isinstance(value, fomod.FileType):
                         self._test_file_condition(key, value)
-                    if isinstance(value, str):
+                    else:
                         self._test_flag_condition(key, value)
-                elif isinstance(key, fomod.Conditions):
-                    self._test_conditions(key)
-            except (FailedCondition, _FailedCondition) as exc:
-                if isinstance(exc, FailedCondition):
-                    msgs = [a.strip() for a in str(exc).splitlines()[1:]]
-                    failed.extend(msgs)
                 else:
-                    failed.append(str(exc))
+                    self._test_conditions(key)
+            except FailedCondition as exc:
+                failed.extend(a.strip() for a in str(exc).splitlines()[1:])
+                if op is fomod.ConditionType.AND:
+                    self._raise_failed_conditions(failed)
+            except _FailedCondition as exc:
+                failed.append(str(exc))
                 if op is fomod.ConditionType.AND:
                     self._raise_failed_conditions(failed)
         if op is fomod.ConditionType.OR and len(failed) == len(conditions):
@@ -352,8 +366,8 @@ class Installer(object):
         if order is fomod.Order.EXPLICIT:
             return unordered_list
         elif order is fomod.Order.ASCENDING:
-            return sorted(unordered_list, key=lambda x: x.name)
+            return sorted(unordered_list, key=attrgetter("name"))
         elif order is fomod.Order.DESCENDING:
-            return sorted(unordered_list, key=lambda x: x.name, reverse=True)
+            return sorted(unordered_list, key=attrgetter("name"), reverse=True)
         else:
             raise ValueError(f"Arguments are incorrect: {unordered_list}, {order}")
@@ -14,8 +14,11 @@
 
 import errno
 import os
+import threading
 from collections import OrderedDict
 from contextlib import suppress
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
 
 from lxml import etree
@@ -52,12 +55,41 @@ from .warnings import (
 
 SCHEMA_PATH = Path(__file__).parent / "fomod.xsd"
 
+_THREAD_LOCAL = threading.local()
+
+
+@lru_cache(maxsize=None)
+def _schema():
+    # compiling the schema is by far the most expensive step in validation
+    # and the xsd never changes, so it's done only once - libxml2 reads the
+    # file itself so no intermediate document tree is built for it
+    return etree.XMLSchema(file=str(SCHEMA_PATH))
+
+
+def _validating_parser():
+    # lxml parsers can't be shared between threads parsing at the same
+    # time, so each thread gets its own (reused) parser
+    try:
+        return _THREAD_LOCAL.validating_parser
+    except AttributeError:
+        parser = etree.XMLParser(schema=_schema())
+        _THREAD_LOCAL.validating_parser = parser
+        return parser
+
 
 class Placeholder(object):
     def __init__(self, tag, attrib):
         self._tag = tag
         self._attrib = attrib
-        self._children = OrderedDict()
+        self._lazy_children = None
+
+    @property
+    def _children(self):
+        # most placeholders are leaf tags (description, flag, image...)
+        # so the dict is only created once a child is actually stored
+        if self._lazy_children is None:
+            self._lazy_children = OrderedDict()
+        return self._lazy_children
 
 
 class PatternPlaceholder(Placeholder):
@@ -73,6 +105,44 @@ class Target(object):
         self._stack = []
         self._data = []
         self._last = None
+        # tag -> method creating that tag's element, any tag
+        # not in here is kept as a placeholder
+        self._start_handlers = {
+            "config": self._start_root,
+            "fomod": self._start_info,
+            "moduleName": self._start_name,
+            "moduleImage": self._start_image,
+            "moduleDependencies": self._start_conditions,
+            "dependencies": self._start_conditions,
+            "visible": self._start_conditions,
+            "requiredInstallFiles": self._start_required_files,
+            "file": self._start_file,
+            "folder": self._start_file,
+            "installSteps": self._start_pages,
+            "installStep": self._start_page,
+            "group": self._start_group,
+            "plugin": self._start_option,
+            "files": self._start_files,
+            "conditionFlags": self._start_flags,
+            "dependencyType": self._start_type,
+            "conditionalFileInstalls": self._start_file_patterns,
+            "pattern": self._start_pattern,
+        }
+        # tag -> method finishing that tag once all its children are parsed
+        self._end_handlers = {
+            "moduleName": self._end_name,
+            "fileDependency": self._end_file_dependency,
+            "flagDependency": self._end_flag_dependency,
+            "gameDependency": self._end_game_dependency,
+            "optionalFileGroups": self._end_order,
+            "plugins": self._end_order,
+            "description": self._end_description,
+            "image": self._end_image,
+            "flag": self._end_flag,
+            "type": self._end_type,
+            "defaultType": self._end_default_type,
+            "pattern": self._end_pattern,
+        }
 
     def _add_warning(self, warning):
         if self.warnings is not None:
@@ -96,142 +166,192 @@ class Target(object):
             self._add_warning(DefaultAttributeWarning(tag, attr, default, elem))
             return default
 
+    def _parent(self):
+        return self._stack[-1] if self._stack else None
+
+    def _gparent(self):
+        # only a handful of tags attach to their grandparent
+        # so it's only looked up by those that need it
+        return self._stack[-2] if len(self._stack) > 1 else None
+
     def start(self, tag, attrib):
         attrib = dict(attrib)
-        with suppress(IndexError):
-            parent = self._stack[-1]
-        with suppress(IndexError):
-            gparent = self._stack[-2]
-        if tag == "config":
-            elem = Root(attrib)
-        elif tag == "fomod":
-            elem = Info(attrib)
-        elif tag == "moduleName":
-            elem = Name(attrib)
-            parent._name = elem
-        elif tag == "moduleImage":
-            elem = Image(attrib)
-            parent._image = elem
-        elif tag in ("moduleDependencies", "dependencies", "visible"):
-            elem = Conditions(attrib)
-            elem.type = self._get_enum(
-                attrib.get("operator", "And"), tag, elem, ConditionType
-            )
-            if isinstance(parent, Conditions):  # nested dependencies
-                parent[elem] = None
-            else:
-                parent.conditions = elem
-        elif tag == "requiredInstallFiles":
-            elem = Files(attrib)
-            parent.files = elem
-        elif tag in ("file", "folder"):
-            elem = File(tag, attrib)
-            with suppress(KeyError):  # skips elem when missing source attr
-                elem.src = self._get_attr(attrib, "source", tag)
-                elem.dst = attrib.get("destination", None)
-                parent._file_list.append(elem)
-        elif tag == "installSteps":
-            elem = Pages(attrib)
-            elem.order = self._get_enum(
-                attrib.get("order", "Ascending"), tag, elem, Order
-            )
-            parent.pages = elem
-        elif tag == "installStep":
-            elem = Page(attrib)
-            elem.name = self._get_attr(attrib, "name", tag, elem, "")
-            parent._page_list.append(elem)
-        elif tag == "group":
-            elem = Group(attrib)
-            elem.name = self._get_attr(attrib, "name", tag, elem, "")
-            group_type = self._get_attr(attrib, "type", tag, elem, "SelectAny")
-            elem.type = self._get_enum(group_type, tag, elem, GroupType)
-            gparent._group_list.append(elem)
-        elif tag == "plugin":
-            elem = Option(attrib)
-            elem.name = self._get_attr(attrib, "name", tag, elem, "")
-            gparent._option_list.append(elem)
-        elif tag == "files":
-            elem = Files(attrib)
-            if isinstance(parent, Option):
-                parent.files = elem
-            else:  # under pattern tag
-                parent.value = elem
-        elif tag == "conditionFlags":
-            elem = Flags(attrib)
-            parent.flags = elem
-        elif tag == "dependencyType":
-            elem = Type(attrib)
-            gparent.type = elem
-        elif tag == "conditionalFileInstalls":
-            elem = FilePatterns(attrib)
-            parent.file_patterns = elem
-        elif tag == "pattern":
-            elem = PatternPlaceholder(attrib)
-        else:
+        handler = self._start_handlers.get(tag)
+        if handler is None:
             elem = Placeholder(tag, attrib)
+        else:
+            elem = handler(tag, attrib, self._parent())
         self._stack.append(elem)
         return elem
 
+    def _start_root(self, tag, attrib, parent):
+        return Root(attrib)
+
+    def _start_info(self, tag, attrib, parent):
+        return Info(attrib)
+
+    def _start_name(self, tag, attrib, parent):
+        elem = Name(attrib)
+        parent._name = elem
+        return elem
+
+    def _start_image(self, tag, attrib, parent):
+        elem = Image(attrib)
+        parent._image = elem
+        return elem
+
+    def _start_conditions(self, tag, attrib, parent):
+        elem = Conditions(attrib)
+        elem._type = self._get_enum(
+            attrib.get("operator", "And"), tag, elem, ConditionType
+        )
+        if isinstance(parent, Conditions):  # nested dependencies
+            parent[elem] = None
+        else:
+            parent.conditions = elem
+        return elem
+
+    def _start_required_files(self, tag, attrib, parent):
+        elem = Files(attrib)
+        parent.files = elem
+        return elem
+
+    def _start_file(self, tag, attrib, parent):
+        elem = File(tag, attrib)
+        with suppress(KeyError):  # skips elem when missing source attr
+            elem.src = self._get_attr(attrib, "source", tag)
+            elem.dst = attrib.get("destination", None)
+            parent._file_list.append(elem)
+        return elem
+
+    def _start_pages(self, tag, attrib, parent):
+        elem = Pages(attrib)
+        elem._order = self._get_enum(attrib.get("order", "Ascending"), tag, elem, Order)
+        parent.pages = elem
+        return elem
+
+    def _start_page(self, tag, attrib, parent):
+        elem = Page(attrib)
+        elem._name = self._get_attr(attrib, "name", tag, elem, "")
+        parent._page_list.append(elem)
+        return elem
+
+    def _start_group(self, tag, attrib, parent):
+        elem = Group(attrib)
+        elem._name = self._get_attr(attrib, "name", tag, elem, "")
+        group_type = self._get_attr(attrib, "type", tag, elem, "SelectAny")
+        elem._type = self._get_enum(group_type, tag, elem, GroupType)
+        self._gparent()._group_list.append(elem)
+        return elem
+
+    def _start_option(self, tag, attrib, parent):
+        elem = Option(attrib)
+        elem._name = self._get_attr(attrib, "name", tag, elem, "")
+        self._gparent()._option_list.append(elem)
+        return elem
+
+    def _start_files(self, tag, attrib, parent):
+        elem = Files(attrib)
+        if isinstance(parent, Option):
+            parent.files = elem
+        else:  # under pattern tag
+            parent.value = elem
+        return elem
+
+    def _start_flags(self, tag, attrib, parent):
+        elem = Flags(attrib)
+        parent.flags = elem
+        return elem
+
+    def _start_type(self, tag, attrib, parent):
+        elem = Type(attrib)
+        self._gparent().type = elem
+        return elem
+
+    def _start_file_patterns(self, tag, attrib, parent):
+        elem = FilePatterns(attrib)
+        parent.file_patterns = elem
+        return elem
+
+    def _start_pattern(self, tag, attrib, parent):
+        return PatternPlaceholder(attrib)
+
     def data(self, data):
         self._data.append(data)
 
     def end(self, tag):
         elem = self._stack.pop()
         assert tag == elem._tag
-        with suppress(IndexError):
-            parent = self._stack[-1]
-        with suppress(IndexError):
-            gparent = self._stack[-2]
-
-        data = "".join(self._data).strip()
-        del self._data[:]
+        parent = self._parent()
 
+        # only placeholders and the module name keep their text
+        data = None
         if isinstance(elem, Placeholder):
+            data = "".join(self._data).strip()
             parent._children[elem._tag] = (elem._attrib, data)
-        if tag == "moduleName":
-            elem.name = data
-        elif tag == "fileDependency":
-            with suppress(KeyError):
-                fname = self._get_attr(elem._attrib, "file", tag)
-                ftype = self._get_attr(elem._attrib, "state", tag, None, "Active")
-                ftype = self._get_enum(ftype, tag, None, FileType)
-                parent[fname] = ftype
-        elif tag == "flagDependency":
-            with suppress(KeyError):
-                fname = self._get_attr(elem._attrib, "flag", tag)
-                fvalue = self._get_attr(elem._attrib, "value", tag, None, "")
-                parent[fname] = fvalue
-        elif tag == "gameDependency":
-            with suppress(KeyError):
-                parent[None] = self._get_attr(elem._attrib, "version", tag)
-        elif tag in ("optionalFileGroups", "plugins"):
-            parent._order = self._get_enum(
-                elem._attrib.get("order", "Ascending"), tag, None, Order
-            )
-        elif tag == "description":
-            parent._description = data
-        elif tag == "image":
-            with suppress(KeyError):
-                parent._image = self._get_attr(elem._attrib, "path", tag)
-        elif tag == "flag":
-            with suppress(KeyError):
-                fname = self._get_attr(elem._attrib, "name", tag)
-                parent._map[fname] = data
-        elif tag == "type":
-            name = self._get_attr(elem._attrib, "name", tag, None, "Optional")
-            otype = self._get_enum(name, tag, elem, OptionType)
-            if isinstance(gparent, Option):
-                gparent._type = otype
-            else:  # under pattern tag
-                parent.value = otype
-        elif tag == "defaultType":
-            name = self._get_attr(elem._attrib, "name", tag, None, "Optional")
-            parent._default = self._get_enum(name, tag, None, OptionType)
-        elif tag == "pattern":
-            gparent[elem.conditions] = elem.value
+        elif tag == "moduleName":
+            data = "".join(self._data).strip()
+        del self._data[:]
+
+        handler = self._end_handlers.get(tag)
+        if handler is not None:
+            handler(tag, elem, parent, data)
         self._last = elem
         return elem
 
+    def _end_name(self, tag, elem, parent, data):
+        elem.name = data
+
+    def _end_file_dependency(self, tag, elem, parent, data):
+        with suppress(KeyError):
+            fname = self._get_attr(elem._attrib, "file", tag)
+            ftype = self._get_attr(elem._attrib, "state", tag, None, "Active")
+            ftype = self._get_enum(ftype, tag, None, FileType)
+            parent[fname] = ftype
+
+    def _end_flag_dependency(self, tag, elem, parent, data):
+        with suppress(KeyError):
+            fname = self._get_attr(elem._attrib, "flag", tag)
+            fvalue = self._get_attr(elem._attrib, "value", tag, None, "")
+            parent[fname] = fvalue
+
+    def _end_game_dependency(self, tag, elem, parent, data):
+        with suppress(KeyError):
+            parent[None] = self._get_attr(elem._attrib, "version", tag)
+
+    def _end_order(self, tag, elem, parent, data):
+        parent._order = self._get_enum(
+            elem._attrib.get("order", "Ascending"), tag, None, Order
+        )
+
+    def _end_description(self, tag, elem, parent, data):
+        parent._description = data
+
+    def _end_image(self, tag, elem, parent, data):
+        with suppress(KeyError):
+            parent._image = self._get_attr(elem._attrib, "path", tag)
+
+    def _end_flag(self, tag, elem, parent, data):
+        with suppress(KeyError):
+            fname = self._get_attr(elem._attrib, "name", tag)
+            parent._map[fname] = data
+
+    def _end_type(self, tag, elem, parent, data):
+        name = self._get_attr(elem._attrib, "name", tag, None, "Optional")
+        otype = self._get_enum(name, tag, elem, OptionType)
+        gparent = self._gparent()
+        if isinstance(gparent, Option):
+            gparent._type = otype
+        else:  # under pattern tag
+            parent.value = otype
+
+    def _end_default_type(self, tag, elem, parent, data):
+        name = self._get_attr(elem._attrib, "name", tag, None, "Optional")
+        parent._default = self._get_enum(name, tag, None, OptionType)
+
+    def _end_pattern(self, tag, elem, parent, data):
+        self._gparent()[elem.conditions] = elem.value
+
     def comment(self, text):
         if text:
             self._add_warning(CommentsPresentWarning())
@@ -244,7 +364,10 @@ class Target(object):
 
 def _iterparse(file_path, target):
     events = ("start", "end")
-    for event, element in etree.iterparse(file_path, events=events):
+    # whitespace between tags is never used, dropping it means fewer text
+    # nodes in the background tree and fewer data calls to the target
+    iterator = etree.iterparse(file_path, events=events, remove_blank_text=True)
+    for event, element in iterator:
         if event == "start":
             new_elem = target.start(element.tag, element.attrib)
             new_elem._lineno = element.sourceline
@@ -252,6 +375,14 @@ def _iterparse(file_path, target):
                 target.data(element.text)
         elif event == "end":
             target.end(element.tag)
+            # the target keeps everything it needs so the tree iterparse
+            # builds in the background can be freed as it goes
+            element.clear(keep_tail=True)
+            # the root has no parent, only comments/PIs before it
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
     return target.close()
 
 
@@ -275,18 +406,23 @@ def parse(source, warnings=None, lineno=False):
         else:
             conf = str(conf)
     if warnings is not None:
-        schema = etree.XMLSchema(etree.parse(str(SCHEMA_PATH)))
+        # validating means going through the file twice
+        # so it's read from disk only once and reused
+        conf_url = str(conf)
+        with open(conf, "rb") as conf_file:
+            conf = BytesIO(conf_file.read())
         try:
-            etree.parse(conf, etree.XMLParser(schema=schema))
+            etree.parse(conf, _validating_parser(), base_url=conf_url)
         except etree.XMLSyntaxError as exc:
             warnings.append(InvalidSyntaxWarning(str(exc)))
+        conf.seek(0)
     parser_target = Target(warnings)
     if lineno:
         root = _iterparse(conf, parser_target)
         if info is not None:
-            root._info = _iterparse(conf, parser_target)
+            root._info = _iterparse(info, parser_target)
     else:
-        parser = etree.XMLParser(target=Target(warnings))
+        parser = etree.XMLParser(target=parser_target)
         root = etree.parse(conf, parser)
         if info is not None:
             root._info = etree.parse(info, parser)
@@ -13,6 +13,18 @@
 # limitations under the License.
 
 import re
+from functools import lru_cache
+
+_CAMEL_CASE_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?=[A-Z]|$)")
+
+
+@lru_cache(maxsize=None)
+def _describe_enum(enum_):
+    # split camel case enum names into title
+    enum_name = " ".join(_CAMEL_CASE_RE.findall(enum_.__name__))
+    enum_values = "', '".join(x.value for x in enum_)
+    enum_default = enum_.default().value
+    return enum_name, enum_values, enum_default
 
 
 class ValidationWarning(object):
@@ -23,6 +35,8 @@ class ValidationWarning(object):
         self.critical = critical
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, ValidationWarning):
             return (
                 self.title == other.title
@@ -42,12 +56,7 @@ class ValidationWarning(object):
 
 class InvalidEnumWarning(ValidationWarning):
     def __init__(self, tag, enum_, actual, elem):
-        # split camel case enum names into title
-        enum_name = " ".join(
-            re.findall(r"[A-Z]?[a-z]+|[A-Z]+(?=[A-Z]|$)", enum_.__name__)
-        )
-        enum_values = "', '".join(x.value for x in enum_)
-        enum_default = enum_.default().value
+        enum_name, enum_values, enum_default = _describe_enum(enum_)
         title = f"Invalid {enum_name}"
         msg = (
             f"{enum_name} was set to '{actual}' in "
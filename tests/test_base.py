@@ -1,3 +1,5 @@
+import pytest
+
 from pyfomod import base
 
 
@@ -36,6 +38,10 @@ class TestHashableSequence:
 
     def test_index(self):
         assert self.seq.index(2) == 1
+        assert self.seq.index(3, -1) == 2
+        assert self.seq.index(2, 0, 10) == 1
+        with pytest.raises(ValueError):
+            self.seq.index(3, 0, -1)
 
     def test_count(self):
         assert self.seq.count(2) == 1
@@ -115,6 +115,16 @@ xsi:noNamespaceSchemaLocation="http://qconsulting.ca/fo3/ModConfig5.0.xsd">
             critical=True,
         )
         assert expected in self.root.validate()
+        nest = fomod.Conditions()
+        nest["beep"] = "boop"
+        page.conditions[nest] = None
+        expected = warnings.ValidationWarning(
+            "Impossible Flag",
+            "The flag 'beep' is never created or set.",
+            nest,
+            critical=True,
+        )
+        assert expected in self.root.validate()
 
 
 class TestInfo:
@@ -199,6 +209,9 @@ class TestConditions:
                 </dependencies>"""
         )
         assert self.cond.to_string() == expected
+        # file dependencies without a file are skipped
+        self.cond[""] = fomod.FileType.ACTIVE
+        assert self.cond.to_string() == expected
 
     def test_validate(self):
         expected = warnings.ValidationWarning(
@@ -244,7 +257,8 @@ class TestFiles:
     def setup_method(self):
         self.files = fomod.Files()
 
-    def test_getitem(self):
+    def add_items(self):
+        # a file and a folder, shared by the lookup tests
         item1 = fomod.File("file")
         item1.src = "boop"
         item1.dst = "boopity"
@@ -252,6 +266,9 @@ class TestFiles:
         item2.src = "beep"
         item2.dst = "beepity"
         self.files._file_list.extend([item1, item2])
+
+    def test_getitem(self):
+        self.add_items()
         assert self.files["boop"] == "boopity"
         assert self.files["beep/"] == "beepity"
 
@@ -263,13 +280,7 @@ class TestFiles:
         assert self.files._file_list[0]._tag == "folder"
 
     def test_delitem(self):
-        item1 = fomod.File("file")
-        item1.src = "boop"
-        item1.dst = "boopity"
-        item2 = fomod.File("folder")
-        item2.src = "beep"
-        item2.dst = "beepity"
-        self.files._file_list.extend([item1, item2])
+        self.add_items()
         assert list(self.files.keys()) == ["boop", "beep/"]
         del self.files["beep/"]
         assert list(self.files.keys()) == ["boop"]
@@ -7,7 +7,12 @@ import pytest
 from pyfomod import fomod, installer
 
 
-def test_installeroption():
+@pytest.fixture
+def installer_mock():
+    return Mock(spec=installer.Installer)
+
+
+def test_installeroption(installer_mock):
     test_option = fomod.Option()
     test_option.name = "name"
     test_option.description = "description"
@@ -22,7 +27,6 @@ def test_installeroption():
     assert inst_option.type is fomod.OptionType.REQUIRED
     test_option.type = fomod.Type()
     test_option.type.default = fomod.OptionType.NOTUSABLE
-    installer_mock = Mock(spec=installer.Installer)
     inst_option = installer.InstallerOption(installer_mock, test_option)
     assert inst_option._installer is installer_mock
     assert inst_option.type is fomod.OptionType.NOTUSABLE
@@ -31,11 +35,10 @@ def test_installeroption():
     assert inst_option.type is fomod.OptionType.COULDBEUSABLE
 
 
-def test_installergroup():
+def test_installergroup(installer_mock):
     test_group = fomod.Group()
     test_group.name = "name"
     test_group.type = fomod.GroupType.ALL
-    installer_mock = Mock(spec=installer.Installer)
     installer_mock._order_list.return_value = ["test1", "test2", "test3"]
     inst_group = installer.InstallerGroup(installer_mock, test_group)
     assert inst_group.name == "name"
@@ -43,10 +46,9 @@ def test_installergroup():
     assert list(inst_group) == ["test1", "test2", "test3"]
 
 
-def test_installerpage():
+def test_installerpage(installer_mock):
     test_page = fomod.Page()
     test_page.name = "name"
-    installer_mock = Mock(spec=installer.Installer)
     installer_mock._order_list.return_value = ["test1", "test2", "test3"]
     inst_page = installer.InstallerPage(installer_mock, test_page)
     assert inst_page.name == "name"
@@ -54,15 +56,16 @@ def test_installerpage():
 
 
 def test_fileinfo_process_files(tmp_path):
-    def fileinfo_list_contains(info_list, test_info):
-        for fileinfo in info_list:
-            if (
-                test_info.source == fileinfo.source
-                and test_info.destination == fileinfo.destination
-                and test_info.priority == fileinfo.priority
-            ):
-                return True
-        return False
+    def fileinfo_set(info_list):
+        return {(info.source, info.destination, info.priority) for info in info_list}
+
+    def make_folder(num):
+        # folderN/{fileN1, folderN1/, folderN2/fileN2}
+        folder = tmp_path / f"folder{num}"
+        (folder / f"folder{num}2").mkdir(parents=True)
+        (folder / f"folder{num}1").mkdir()
+        (folder / f"file{num}1").touch()
+        (folder / f"folder{num}2" / f"file{num}2").touch()
 
     test_files = fomod.Files()
     test_file = fomod.File("file")
@@ -84,74 +87,42 @@ def test_fileinfo_process_files(tmp_path):
     test_file = fomod.File("file")
     test_file.src = "folder1"
     test_file.dst = None
-    (tmp_path / "folder1").mkdir()
-    (tmp_path / "folder1" / "file11").touch()
-    (tmp_path / "folder1" / "folder11").mkdir()
-    (tmp_path / "folder1" / "folder12").mkdir()
-    (tmp_path / "folder1" / "folder12" / "file12").touch()
+    make_folder(1)
     test_files._file_list.append(test_file)
     test_file = fomod.File("file")
     test_file.src = "folder2"
     test_file.dst = ""
-    (tmp_path / "folder2").mkdir()
-    (tmp_path / "folder2" / "file21").touch()
-    (tmp_path / "folder2" / "folder21").mkdir()
-    (tmp_path / "folder2" / "folder22").mkdir()
-    (tmp_path / "folder2" / "folder22" / "file22").touch()
+    make_folder(2)
     test_files._file_list.append(test_file)
     test_file = fomod.File("file")
     test_file.src = "folder3"
     test_file.dst = "dest3/"
-    (tmp_path / "folder3").mkdir()
-    (tmp_path / "folder3" / "file31").touch()
-    (tmp_path / "folder3" / "folder31").mkdir()
-    (tmp_path / "folder3" / "folder32").mkdir()
-    (tmp_path / "folder3" / "folder32" / "file32").touch()
+    make_folder(3)
     test_files._file_list.append(test_file)
     test_file = fomod.File("file", attrib={"priority": "1"})
     test_file.src = "folder4"
     test_file.dst = "dest4"
-    (tmp_path / "folder4").mkdir()
-    (tmp_path / "folder4" / "file41").touch()
-    (tmp_path / "folder4" / "folder41").mkdir()
-    (tmp_path / "folder4" / "folder42").mkdir()
-    (tmp_path / "folder4" / "folder42" / "file42").touch()
+    make_folder(4)
     test_files._file_list.append(test_file)
     test_file = fomod.File("folder")
     test_file.src = "folder6"
     test_file.dst = None
-    (tmp_path / "folder6").mkdir()
-    (tmp_path / "folder6" / "file61").touch()
-    (tmp_path / "folder6" / "folder61").mkdir()
-    (tmp_path / "folder6" / "folder62").mkdir()
-    (tmp_path / "folder6" / "folder62" / "file62").touch()
+    make_folder(6)
     test_files._file_list.append(test_file)
     test_file = fomod.File("folder")
     test_file.src = "folder7"
     test_file.dst = ""
-    (tmp_path / "folder7").mkdir()
-    (tmp_path / "folder7" / "file71").touch()
-    (tmp_path / "folder7" / "folder71").mkdir()
-    (tmp_path / "folder7" / "folder72").mkdir()
-    (tmp_path / "folder7" / "folder72" / "file72").touch()
+    make_folder(7)
     test_files._file_list.append(test_file)
     test_file = fomod.File("folder")
     test_file.src = "folder8"
     test_file.dst = "dest5"
-    (tmp_path / "folder8").mkdir()
-    (tmp_path / "folder8" / "file81").touch()
-    (tmp_path / "folder8" / "folder81").mkdir()
-    (tmp_path / "folder8" / "folder82").mkdir()
-    (tmp_path / "folder8" / "folder82" / "file82").touch()
+    make_folder(8)
     test_files._file_list.append(test_file)
     test_file = fomod.File("folder", attrib={"priority": "1"})
     test_file.src = "folder9"
     test_file.dst = "dest6"
-    (tmp_path / "folder9").mkdir()
-    (tmp_path / "folder9" / "file91").touch()
-    (tmp_path / "folder9" / "folder91").mkdir()
-    (tmp_path / "folder9" / "folder92").mkdir()
-    (tmp_path / "folder9" / "folder92" / "file92").touch()
+    make_folder(9)
     test_files._file_list.append(test_file)
     expected = [
         installer.FileInfo("file1", "file1", 0),
@@ -169,8 +140,7 @@ def test_fileinfo_process_files(tmp_path):
     ]
     result = installer.FileInfo.process_files(test_files, None)
     assert len(result) == len(expected)
-    for info in result:
-        assert fileinfo_list_contains(expected, info)
+    assert fileinfo_set(result) == fileinfo_set(expected)
     expected = [
         installer.FileInfo("file1", "file1", 0),
         installer.FileInfo("file2", "file2", 0),
@@ -265,8 +235,7 @@ def test_fileinfo_process_files(tmp_path):
     ]
     result = installer.FileInfo.process_files(test_files, tmp_path)
     assert len(result) == len(expected)
-    for info in result:
-        assert fileinfo_list_contains(expected, info)
+    assert fileinfo_set(result) == fileinfo_set(expected)
 
 
 class TestInstaller(object):
@@ -312,8 +281,23 @@ class TestInstaller(object):
         assert test_installer.next()._object is test_root.pages[2]
         assert test_installer.next() is None
 
-    def test_previous(self):
-        installer_mock = Mock(spec=installer.Installer)
+    def test_next_sorts_options(self):
+        test_root = fomod.Root()
+        test_root.pages.append(fomod.Page())
+        test_group = fomod.Group()
+        test_group.type = fomod.GroupType.ANY
+        test_group.extend([fomod.Option(), fomod.Option(), fomod.Option()])
+        test_root.pages[0].append(test_group)
+        test_installer = installer.Installer(test_root)
+        test_installer.next()
+        selected = [
+            installer.InstallerOption(test_installer, test_group[2]),
+            installer.InstallerOption(test_installer, test_group[0]),
+        ]
+        assert test_installer.next(selected) is None
+        assert test_installer.previous()[1] == [test_group[0], test_group[2]]
+
+    def test_previous(self, installer_mock):
         test_page = fomod.Page()
         test_option = fomod.Option()
         installer_mock._has_finished = True
@@ -329,8 +313,7 @@ class TestInstaller(object):
         assert installer.Installer.previous(installer_mock) is None
         assert installer_mock._current_page is None
 
-    def test_files(self):
-        installer_mock = Mock(spec=installer.Installer)
+    def test_files(self, installer_mock):
         installer_mock.path = None
         files1 = fomod.Files()
         file1 = fomod.File("file", attrib={"priority": "2"})
@@ -359,8 +342,7 @@ class TestInstaller(object):
         expected = {"source1": "dest1", "source3": "dest2", "source4": "dest3"}
         assert installer.Installer.files(installer_mock) == expected
 
-    def test_flags(self):
-        installer_mock = Mock(spec=installer.Installer)
+    def test_flags(self, installer_mock):
         flags1 = fomod.Flags()
         flags1["flag1"] = "value1"
         flags2 = fomod.Flags()
@@ -378,9 +360,13 @@ class TestInstaller(object):
         )
         expected = {"flag1": "value3", "flag2": "value2"}
         assert installer.Installer.flags(installer_mock) == expected
+        installer.Installer.flags(installer_mock)["flag1"] = "other"
+        assert installer.Installer.flags(installer_mock) == expected
+        flags3["flag1"] = "changed"
+        expected = {"flag1": "changed", "flag2": "value2"}
+        assert installer.Installer.flags(installer_mock) == expected
 
-    def test_test_file_condition(self):
-        installer_mock = Mock(spec=installer.Installer)
+    def test_test_file_condition(self, installer_mock):
         installer_mock.file_type = None
         installer.Installer._test_file_condition(
             installer_mock, "test_file", fomod.FileType.ACTIVE
@@ -395,8 +381,7 @@ class TestInstaller(object):
                 installer_mock, "test_file", fomod.FileType.INACTIVE
             )
 
-    def test_test_flag_condition(self):
-        installer_mock = Mock(spec=installer.Installer)
+    def test_test_flag_condition(self, installer_mock):
         installer_mock.flags.return_value = {"flag": "value"}
         installer.Installer._test_flag_condition(installer_mock, "flag", "value")
         with pytest.raises(installer._FailedCondition):
@@ -404,8 +389,7 @@ class TestInstaller(object):
         with pytest.raises(installer._FailedCondition):
             installer.Installer._test_flag_condition(installer_mock, "other", "value")
 
-    def test_test_version_condition(self):
-        installer_mock = Mock(spec=installer.Installer)
+    def test_test_version_condition(self, installer_mock):
         installer_mock.game_version = None
         installer.Installer._test_version_condition(installer_mock, "0.1")
         installer_mock.game_version = "1.0"
@@ -413,8 +397,7 @@ class TestInstaller(object):
         with pytest.raises(installer._FailedCondition):
             installer.Installer._test_version_condition(installer_mock, "1.1")
 
-    def test_test_conditions(self):
-        installer_mock = Mock(spec=installer.Installer)
+    def test_test_conditions(self, installer_mock):
         test_conditions = fomod.Conditions()
         test_conditions["file"] = fomod.FileType.MISSING
         test_conditions["flag"] = "value"
@@ -443,22 +426,23 @@ class TestInstaller(object):
         installer.Installer._test_conditions(installer_mock, test_conditions)
         installer_mock._raise_failed_conditions.assert_called_once()
 
-    def test_order_list(self):
-        mock1 = Mock(spec=["name"])
-        mock1.name = "bb"
-        mock2 = Mock(spec=["name"])
-        mock2.name = "cc"
-        mock3 = Mock(spec=["name"])
-        mock3.name = "aa"
-        test_list = [mock1, mock2, mock3]
-        expected = [mock1, mock2, mock3]
-        result = installer.Installer._order_list(test_list, fomod.Order.EXPLICIT)
-        assert result == expected
-        expected = [mock3, mock1, mock2]
-        result = installer.Installer._order_list(test_list, fomod.Order.ASCENDING)
-        assert result == expected
-        expected = [mock2, mock1, mock3]
-        result = installer.Installer._order_list(test_list, fomod.Order.DESCENDING)
-        assert result == expected
+    @pytest.mark.parametrize(
+        "order, expected",
+        [
+            (fomod.Order.EXPLICIT, ["bb", "cc", "aa"]),
+            (fomod.Order.ASCENDING, ["aa", "bb", "cc"]),
+            (fomod.Order.DESCENDING, ["cc", "bb", "aa"]),
+        ],
+    )
+    def test_order_list(self, order, expected):
+        test_list = []
+        for name in ("bb", "cc", "aa"):
+            test_mock = Mock(spec=["name"])
+            test_mock.name = name
+            test_list.append(test_mock)
+        result = installer.Installer._order_list(test_list, order)
+        assert [item.name for item in result] == expected
+
+    def test_order_list_invalid(self):
         with pytest.raises(ValueError):
-            installer.Installer._order_list(test_list, "not an order")
+            installer.Installer._order_list([], "not an order")
@@ -1,20 +1,27 @@
 import textwrap
 from pathlib import Path
 
-from pyfomod import ValidationWarning, parser
+import pytest
+
+from pyfomod import ValidationWarning, fomod, parser
 
 PACKAGE_PATH = Path(__file__).parent / "package_test"
 INFO_PATH = Path(PACKAGE_PATH, "fomod", "info.xml")
 CONF_PATH = Path(PACKAGE_PATH, "fomod", "moduleconfig.xml")
 
 
-def test_preserve_data(tmp_path):
+@pytest.fixture(scope="module")
+def package_root():
+    # parsed once and shared by the tests that only read it
+    return parser.parse(str(PACKAGE_PATH))
+
+
+def test_preserve_data(tmp_path, package_root):
     with INFO_PATH.open() as info_file:
         orig_info = info_file.read()
     with CONF_PATH.open() as conf_file:
         orig_conf = conf_file.read()
-    root = parser.parse(str(PACKAGE_PATH))
-    parser.write(root, str(tmp_path))
+    parser.write(package_root, str(tmp_path))
     info_path = tmp_path / "fomod" / "info.xml"
     with info_path.open() as info_file:
         new_info = info_file.read()
@@ -25,11 +32,79 @@ def test_preserve_data(tmp_path):
     assert orig_conf == new_conf
 
 
-def test_parse(tmp_path):
-    root = parser.parse(str(PACKAGE_PATH))
+def test_parse_attachment(package_root):
+    # each parsed object must end up on the parent the handlers picked
+    conditions = list(package_root.conditions.items())
+    assert conditions[0] == ("depend1.plugin", fomod.FileType.ACTIVE)
+    nested, value = conditions[1]
+    assert value is None
+    assert nested.type is fomod.ConditionType.OR
+    assert dict(nested) == {
+        "depend2v1.plugin": fomod.FileType.ACTIVE,
+        "depend2v2.plugin": fomod.FileType.ACTIVE,
+    }
+    assert [page.name for page in package_root.pages] == ["Choose Option"]
+    page = package_root.pages[0]
+    assert [group.name for group in page] == [
+        "Select an option:",
+        "Select a texture:",
+    ]
+    option = page[0][0]
+    assert option.name == "Option A"
+    assert option.image == "fomod/option_a.png"
+    assert dict(option.flags) == {"option_a": "selected"}
+    assert option.type is fomod.OptionType.RECOMMENDED
+    assert page[1][1].name == "Texture Red"
+    assert page[1][1].type is fomod.OptionType.OPTIONAL
+    cond, files = list(package_root.file_patterns.items())[0]
+    assert dict(cond) == {"option_a": "selected", "texture_blue": "selected"}
+    assert dict(files) == {"option_a/": None, "texture_blue_a/": None}
+
+
+def test_parse_lineno_header_comment(tmp_path):
+    (tmp_path / "fomod").mkdir()
+    conf_path = tmp_path / "fomod" / "moduleconfig.xml"
+    with CONF_PATH.open() as conf_file:
+        content = conf_file.read()
+    with conf_path.open("w") as conf_file:
+        conf_file.write("<!-- generated by some tool -->\n")
+        conf_file.write(content)
+    root = parser.parse((None, str(conf_path)), lineno=True)
+    assert root.to_string() == parser.parse((None, str(CONF_PATH))).to_string()
+
+
+@pytest.mark.parametrize("lineno", [False, True])
+def test_parse_misplaced_tags(tmp_path, lineno):
+    # well-formed but misplaced tags are ignored, not fatal
+    content = textwrap.dedent(
+        """\
+            <config>
+            <foo>
+                <moduleName>misplaced</moduleName>
+                <conditionFlags>
+                    <flag name="flag">value</flag>
+                </conditionFlags>
+                <installSteps order="Explicit"/>
+            </foo>
+            <moduleName>name</moduleName>
+            </config>
+        """
+    )
+    conf_path = tmp_path / "moduleconfig.xml"
+    with conf_path.open("w") as conf_file:
+        conf_file.write(content)
+    root = parser.parse((None, str(conf_path)), lineno=lineno)
+    assert root.name == "name"
+    assert not root.pages
+
+
+def test_parse(tmp_path, package_root):
     tuple_root = parser.parse((str(INFO_PATH), str(CONF_PATH)))
-    assert root.to_string() == tuple_root.to_string()
-    assert root._info.to_string() == tuple_root._info.to_string()
+    assert package_root.to_string() == tuple_root.to_string()
+    assert package_root._info.to_string() == tuple_root._info.to_string()
+    lineno_root = parser.parse(str(PACKAGE_PATH), warnings=[], lineno=True)
+    assert package_root.to_string() == lineno_root.to_string()
+    assert package_root._info.to_string() == lineno_root._info.to_string()
     content = textwrap.dedent(
         """\
             <config>